@@ -6,17 +6,41 @@
 import os
 import json
 import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from types import MappingProxyType, SimpleNamespace
 
 # External Python libraries
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, StreamingResponse
-import requests
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import httpx
+import orjson
 import uvicorn
 
+try:  # Optional accelerator: lazy SIMD parsing materializes only the fields read
+    import simdjson
+except ImportError:
+    simdjson = None
+
 # Package Python libraries
 
 logging.basicConfig(level=logging.INFO)
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    """Closes the shared upstream HTTP client when the server shuts down."""
+    yield
+    await CLIENT.aclose()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+# Shrinks /api/tags and buffered /api/chat bodies ~70% for remote IDE clients;
+# bodies under the threshold go out uncompressed and compresslevel=4 keeps the
+# CPU cost low on these small JSON payloads.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
 
 OLLAMA_ADDRESS = os.getenv("OLLAMA_ADDRESS", "127.0.0.1")
 OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", "11434"))
@@ -42,37 +66,86 @@ MODEL_METADATA = {
 JSON_MEDIA_TYPE = "application/json"
 DONE_MARKER = b"data: [DONE]"
 DATA_PREFIX = b"data: "
+_ORJSON_LOADS = orjson.loads  # Module-level aliases save an attribute lookup per token
+_ORJSON_DUMPS = orjson.dumps
+# When pysimdjson is installed, intermediate frames are parsed lazily: the
+# document view only materializes the three fields the fast path reads. The
+# parser is reused across lines, which is safe because each view is consumed
+# before the next parse invalidates it.
+_PARSE_FRAME = simdjson.Parser().parse if simdjson is not None else _ORJSON_LOADS
+
+# Constant "/" body, serialized once. Only the bytes are cached: a Response
+# instance cannot be shared across requests because GZipMiddleware rewrites
+# the response headers in place.
+ROOT_BYTES = orjson.dumps({"message": "Ollama is running"})
+AUTH_HEADERS = {"Authorization": f"Bearer {API_KEY}", "Content-Type": JSON_MEDIA_TYPE}  # Built once per process
+# Template for the upstream payload; the per-request fields are merged on top
+# in the chat handler so the constant part is never rebuilt.
+DEFAULT_PAYLOAD = {
+    # TODO Additional parameters yet ignored and to be tested
+    # https://api-docs.deepseek.com/api/create-chat-completion
+    # "frequency_penalty": 0,
+    # "max_tokens": 2048,
+    # "presence_penalty": 0,
+    # "response_format": {
+    #     "type": "text"
+    # },
+    # "stop": None,
+    # "stream_options": None,
+    # "temperature": 1,
+    # "top_p": 1,
+    # "tools": None,
+    # "tool_choice": "none",
+    # "logprobs": False,
+    # "top_logprobs": None,
+}
 
+# Pooled client shared by all upstream requests; HTTP/2 multiplexes concurrent
+# chats over one TLS connection and the read timeout stays unset so slow
+# reasoner streams are not cut off between tokens.
+CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0, read=None),
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+)
 
-@app.get("/")
-async def root():
+
+async def root(request):
     """
     Handles the root endpoint of the application.
 
     This function is mapped to the root endpoint ("/") of the application
     and returns a JSON response containing a message indicating that
-    Ollama is running. It utilizes FastAPI's asynchronous support for
-    handling HTTP requests and relies on the `JSONResponse` class for
-    sending structured JSON data as the HTTP response.
+    Ollama is running. It is registered as a plain Starlette route rather
+    than a FastAPI endpoint, skipping the dependency-injection and
+    response-model machinery the constant body does not need.
 
     Returns
     -------
-    JSONResponse
-        An instance of FastAPI's JSONResponse containing the message
-        indicating the application is operational.
+    Response
+        A response carrying the pre-serialized message indicating the
+        application is operational.
     """
-    return JSONResponse(content={"message": "Ollama is running"})
+    return Response(content=ROOT_BYTES, media_type=JSON_MEDIA_TYPE)
+
+
+app.add_route("/", root, methods=["GET"])
 
 
-def parse_response_line(line):
+def parse_response_line(line, message=None):
     """
     Parses a single line of response from a specified format, extracting
     details about a model's output, including message content, completion
     status, and evaluation metrics if available.
 
     Args:
-        line (str): The line of response to parse, expected to follow a
+        line (bytes): The line of response to parse, expected to follow a
             predefined format.
+        message (dict, optional): A reusable message dict to populate in
+            place. Callers that parse many lines per stream pass one in to
+            avoid reallocating the skeleton for every token; the returned
+            output references it, so it must be consumed before the next
+            call.
 
     Returns:
         dict or None: A dictionary containing parsed response data, including
@@ -84,111 +157,230 @@ def parse_response_line(line):
         None explicitly. Logs errors if JSON decoding or data extraction
         fails during processing.
     """
+    # Fast path: bail out on empty lines, heartbeats, the done marker, and
+    # anything else that is not a data frame before paying for a JSON parse.
+    # The one-byte check (0x64 == "d") rejects blank and ": keep-alive" lines
+    # without a prefix comparison, and removeprefix returns the original
+    # object unchanged on a mismatch, so one call does the prefix test and
+    # the strip without a second scan.
+    if not line or line[0] != 0x64 or line == DONE_MARKER:
+        return None
+    payload = line.removeprefix(DATA_PREFIX)
+    if payload is line:
+        return None
     try:
-        if line == DONE_MARKER:
+        response_data = _ORJSON_LOADS(payload)
+        choices = response_data["choices"]
+        if not choices:
             return None
-        if line.startswith(DATA_PREFIX):
-            response_data = json.loads(line[len(DATA_PREFIX) :])
-            if not isinstance(response_data, dict) or "choices" not in response_data:
-                return None
-            choices = response_data["choices"]
-            if len(choices) == 0:
-                return None
-            choice = choices[0]
-            model = response_data["model"]
-            content = choice["delta"]["content"]
-            done = choice["finish_reason"] == "stop"
-            output = {
-                "model": model,
-                "message": {"role": "assistant", "content": content, "images": None},
-                "done": done,
-            }
-            if done:
-                usage = response_data.get("usage", {})
-                eval_count = usage.get("total_tokens", 0)
-                prompt_eval_count = usage.get("prompt_tokens", 0)
-                output.update({"eval_count": eval_count, "prompt_eval_count": prompt_eval_count})
-            return output
-    except (json.JSONDecodeError, KeyError) as e:
-        logging.error(f"Failed to decode JSON or extract data: {e}, line: {line}")
+        choice = choices[0]
+        model = response_data["model"]
+        content = choice["delta"]["content"]
+        done = choice["finish_reason"] == "stop"
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        logger.error("Failed to decode JSON or extract data: %s, line: %s", e, line)
         return None
+    if not content and not done:
+        # Start-of-stream role frames and heartbeat deltas carry no content;
+        # dropping them here saves serializing an empty NDJSON line.
+        return None
+    if message is None:
+        message = {"role": "assistant", "content": "", "images": None}
+    message["content"] = content
+    output = {
+        "model": model,
+        "message": message,
+        "done": done,
+    }
+    if done:
+        usage = response_data.get("usage", {})
+        output["eval_count"] = usage.get("total_tokens", 0)
+        output["prompt_eval_count"] = usage.get("prompt_tokens", 0)
+    return output
 
 
-def generate_streaming_response(request_payload, headers):
+async def generate_streaming_response(request_payload, headers, api_endpoint):
     """
     Generate a streaming response from a POST request to a specified API endpoint.
 
-    This function sends a POST request to the provided API URL using the specified
-    headers and request payload. It streams the response line by line, parses each
-    line received, and yields the parsed response in JSON format. The function
-    is designed for scenarios where data is continuously streamed from the server
-    and needs to be processed incrementally.
+    This function sends a POST request to the provided API endpoint using the shared
+    asynchronous HTTP client. It streams the response line by line, parses each
+    line received, and yields the parsed response in JSON format. Because the
+    generator is asynchronous, iteration stays on the event loop instead of
+    being offloaded to the threadpool by Starlette.
 
     Args:
         request_payload (dict): The JSON payload to be sent in the POST request.
         headers (dict): The headers to be included in the POST request.
+        api_endpoint (str): The upstream URL resolved for the requested model.
 
     Yields:
-        str: A JSON-formatted string containing the parsed response object for
+        bytes: A JSON-formatted line containing the parsed response object for
              each received line.
     """
-    with requests.post(API_URL, headers=headers, json=request_payload, stream=True) as response:
-        for line in response.iter_lines():
-            parsed_response = parse_response_line(line)
-            if parsed_response:
-                yield json.dumps(parsed_response) + "\n"
-
-
-def handle_streaming_response(request_payload, headers):
+    # Everything but the content is constant for intermediate frames, so the
+    # surrounding JSON is pre-serialized once per stream and only the escaped
+    # content bytes are spliced in per token. The final frame carries the
+    # usage counters and still goes through the full parse/serialize path.
+    frame_prefix = b'{"model":' + orjson.dumps(request_payload["model"]) + b',"message":{"role":"assistant","content":'
+    frame_suffix = b',"images":null},"done":false}\n'
+    async with CLIENT.stream("POST", api_endpoint, headers=headers, json=request_payload) as response:
+        # Assemble lines from raw chunks in a single growing buffer instead of
+        # iter_lines(), whose per-chunk concatenate-and-rescan is quadratic on
+        # lines spanning many chunks.
+        buffer = bytearray()
+        # One message skeleton per stream; parse_response_line fills it in
+        # place and the dump below consumes it before the next line.
+        message = {"role": "assistant", "content": "", "images": None}
+        async for chunk in response.aiter_bytes(65536):
+            buffer.extend(chunk)
+            while (newline_index := buffer.find(b"\n")) != -1:
+                line = bytes(buffer[:newline_index])
+                del buffer[: newline_index + 1]
+                if line.endswith(b"\r"):
+                    line = line[:-1]
+                if not line or line[0] != 0x64 or line == DONE_MARKER:
+                    continue
+                payload = line.removeprefix(DATA_PREFIX)
+                if payload is line:
+                    continue
+                choice = None
+                try:
+                    choice = _PARSE_FRAME(payload)["choices"][0]
+                    content = choice["delta"]["content"]
+                    done = choice["finish_reason"] == "stop"
+                except (ValueError, KeyError, IndexError, TypeError):
+                    # Malformed or unexpected frame; let the full parser log it.
+                    done = True
+                    content = None
+                finally:
+                    # Release the lazy view so the reused parser accepts the
+                    # next line; content and done are already materialized.
+                    del choice
+                if not done:
+                    if not content:
+                        continue
+                    yield frame_prefix + _ORJSON_DUMPS(content) + frame_suffix
+                    continue
+                parsed_response = parse_response_line(line, message)
+                if parsed_response:
+                    yield _ORJSON_DUMPS(parsed_response) + b"\n"
+
+
+async def handle_streaming_response(request_payload, headers, api_endpoint):
     """
     Handles the creation of a streaming response using the provided request payload
-    and headers. This function prepares a StreamingResponse object with a generator
-    that produces the streaming content.
+    and headers. This function prepares a StreamingResponse object with an async
+    generator that produces the streaming content on the event loop.
 
     Args:
         request_payload (dict): The payload of the request containing the necessary
         data for generating the streaming response.
         headers (dict): The headers to be included in the streaming response.
+        api_endpoint (str): The upstream URL resolved for the requested model.
 
     Returns:
         StreamingResponse: An HTTP streaming response object with a specified
         JSON media type.
     """
-    return StreamingResponse(generate_streaming_response(request_payload, headers), media_type=JSON_MEDIA_TYPE)
+    return StreamingResponse(
+        generate_streaming_response(request_payload, headers, api_endpoint),
+        media_type=JSON_MEDIA_TYPE,
+        # Declaring identity up front makes GZipMiddleware pass the stream
+        # through untouched, so tokens are not delayed by compression buffers.
+        headers={"Content-Encoding": "identity"},
+    )
 
 
-def handle_non_streaming_response(request_payload, headers):
+async def handle_non_streaming_response(request_payload, headers, api_endpoint):
     """
     Handles non-streaming response for a given request payload by making an API POST
-    request. The function processes the API response and returns a structured JSON
-    response containing model and message information. If an error occurs during
-    request execution, it captures and returns the error details in a JSON response.
+    request on the shared asynchronous client, so the event loop stays free for the
+    full upstream round trip. The function processes the API response and returns a
+    structured JSON response containing model and message information. If an error
+    occurs during request execution, it captures and returns the error details in a
+    JSON response.
 
     Args:
         request_payload (dict): The payload to be sent to the API in JSON format.
         headers (dict): The HTTP headers to include in the API request.
+        api_endpoint (str): The upstream URL resolved for the requested model.
 
     Raises:
-        requests.exceptions.HTTPError: If the response from the API indicates an
+        httpx.HTTPStatusError: If the response from the API indicates an
         unsuccessful HTTP status code.
         Exception: For any unexpected errors that occur during the request
         execution or response processing.
 
     Returns:
-        JSONResponse: A response containing either the retrieved model and message
+        ORJSONResponse: A response containing either the retrieved model and message
         from the API, or error details if an exception is encountered.
     """
     try:
-        response = requests.post(API_URL, headers=headers, json=request_payload)
+        response = await CLIENT.post(api_endpoint, headers=headers, json=request_payload)
         response.raise_for_status()
-        response_data = response.json()
+        # Parse the upstream bytes with orjson and serialize the rewrapped
+        # payload straight back to bytes, skipping the stdlib json round-trip
+        # that response.json() plus a JSON response class would perform.
+        response_data = orjson.loads(response.content)
         message = response_data["choices"][0]["message"]
         model = response_data["model"]
-        return JSONResponse(content={"model": model, "message": message, "done": True})
-    except requests.exceptions.HTTPError as http_err:
-        return JSONResponse(content={"error": f"HTTP error occurred: {http_err}"}, status_code=500)
+        return Response(
+            content=orjson.dumps({"model": model, "message": message, "done": True}),
+            media_type=JSON_MEDIA_TYPE,
+        )
+    except httpx.HTTPStatusError as http_err:
+        return ORJSONResponse(content={"error": f"HTTP error occurred: {http_err}"}, status_code=500)
     except Exception as err:
-        return JSONResponse(content={"error": f"An error occurred: {err}"}, status_code=500)
+        return ORJSONResponse(content={"error": f"An error occurred: {err}"}, status_code=500)
+
+
+def validate_message_sequence(messages):
+    """
+    Validates the role sequence of a reasoner conversation in a single pass.
+
+    The deepseek-reasoner endpoint rejects conversations whose messages do not
+    alternate between the user and assistant roles, so invalid sequences are
+    caught here and reported as a 400 instead of an opaque upstream error.
+    Roles are re-encoded to small integer codes as the list is walked and the
+    error strings are only built on the failing branch, keeping the happy path
+    free of string formatting. Only user and assistant messages take part in
+    the alternation walk: system prompts (which the AI Assistant client sends
+    and upstream accepts) and any roles unknown to this proxy are forwarded
+    untouched, so the only sequences rejected here are the successive
+    same-role turns upstream is known to refuse. The function is installed as
+    the reasoner's validator in MODEL_SPECS, so it no longer needs to check
+    the model itself.
+
+    Args:
+        messages (list): The conversation messages from the request payload.
+
+    Returns:
+        dict or None: An error payload suitable for a 400 response, or None
+            when the sequence is valid.
+    """
+    prev_code = -1
+    for index, message in enumerate(messages):
+        role = message.get("role")
+        code = 0 if role == "user" else 1 if role == "assistant" else -1
+        if code < 0:
+            continue
+        if code == prev_code:
+            return {"error": f"Messages must alternate between user and assistant; got successive {role!r} at message {index}"}
+        prev_code = code
+    return None
+
+
+# One descriptor per supported model so the chat handler does a single lookup
+# and no further per-model branching; the read-only view keeps unknown model
+# names failing fast with a 400 instead of a 500.
+MODEL_SPECS = MappingProxyType(
+    {
+        MODEL_CHAT: SimpleNamespace(endpoint=API_URL, validator=None),
+        MODEL_REASONER: SimpleNamespace(endpoint=API_URL, validator=validate_message_sequence),
+        # MODEL_CODER: SimpleNamespace(endpoint=API_URL, validator=None),  # TODO Not supported
+    }
+)
 
 
 @app.post("/api/chat")
@@ -205,47 +397,30 @@ async def chat(request: Request):
         ValueError: If the required 'messages' field is not provided in the request payload.
 
     Returns:
-        JSONResponse: A JSON response containing either the result from the external service or an error message.
+        ORJSONResponse: A JSON response containing either the result from the external service or an error message.
     """
-    data = await request.json()
+    body = await request.body()
+    data = orjson.loads(body)
     model = data.get("model")
+    spec = MODEL_SPECS.get(model)
     messages = data.get("messages")
     stream = data.get("stream", False)
-    if not messages:
-        return JSONResponse(content={"error": "model and prompt are required"}, status_code=400)
+    if spec is None or not messages or not isinstance(messages, list):
+        return ORJSONResponse(content={"error": "model and prompt are required"}, status_code=400)
+    if spec.validator is not None and (validation_error := spec.validator(messages)):
+        return ORJSONResponse(content=validation_error, status_code=400)
 
-    request_payload = {
-        "model": model,
-        "messages": messages,
-        "stream": stream,
-        # TODO Additional parameters yet ignored and to be tested
-        # https://api-docs.deepseek.com/api/create-chat-completion
-        # "frequency_penalty": os.0,
-        # "max_tokens": 2048,
-        # "presence_penalty": 0,
-        # "response_format": {
-        #     "type": "text"
-        # },
-        # "stop": None,
-        # "stream_options": None,
-        # "temperature": 1,
-        # "top_p": 1,
-        # "tools": None,
-        # "tool_choice": "none",
-        # "logprobs": False,
-        # "top_logprobs": None,
-    }
-    logging.debug(json.dumps(request_payload, indent=2))
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": JSON_MEDIA_TYPE}
-    return (
-        handle_streaming_response(request_payload, headers)
-        if stream
-        else handle_non_streaming_response(request_payload, headers)
-    )
+    request_payload = {**DEFAULT_PAYLOAD, "model": model, "messages": messages, "stream": stream}
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(request_payload, indent=2))
+    if stream:
+        return await handle_streaming_response(request_payload, AUTH_HEADERS, spec.endpoint)
+    return await handle_non_streaming_response(request_payload, AUTH_HEADERS, spec.endpoint)
 
 
+@lru_cache(maxsize=8)
 def create_model_dict(name):
-    """Creates a dictionary representing the metadata of a model."""
+    """Creates a dictionary representing the metadata of a model, cached per name."""
     return {
         "name": name,
         "model": name,
@@ -253,24 +428,31 @@ def create_model_dict(name):
     }
 
 
-@app.get("/api/tags")
-async def get_tags():
-    """
-    Retrieves a list of available models with their respective metadata.
-    This function handles an HTTP GET request to fetch a predefined list of models offered by the service.
-    The response includes metadata for each model such as its name, size, digest, last modification date,
-    and additional details like format and model family.
-    Return:
-        dict: A dictionary with key 'models' containing a list of dictionaries, each representing
-        the metadata details of a model.
-    """
-    return {
+TAGS_BYTES = orjson.dumps(
+    {
         "models": [
             create_model_dict(MODEL_CHAT),
             create_model_dict(MODEL_REASONER),
             # create_model_dict(MODEL_CODER),  # TODO Not supported
         ]
     }
+)  # Constant "/api/tags" body, serialized once at import time (see ROOT_BYTES
+# for why the Response wrapper itself is not cached)
+
+
+async def get_tags(request):
+    """
+    Retrieves a list of available models with their respective metadata.
+    This function handles an HTTP GET request to fetch a predefined list of models offered by the service.
+    The model list is constant for the lifetime of the process, so the JSON body is serialized once at
+    import time and returned verbatim on every request via a plain Starlette route.
+    Return:
+        Response: A response carrying the pre-serialized 'models' payload.
+    """
+    return Response(content=TAGS_BYTES, media_type=JSON_MEDIA_TYPE)
+
+
+app.add_route("/api/tags", get_tags, methods=["GET"])
 
 
 def run_server():
@@ -279,10 +461,27 @@ def run_server():
     function initializes the server with specified configurations for host address, port,
     reload settings, and log level.
 
+    The uvloop event loop and httptools HTTP parser replace their pure-Python
+    counterparts, and several worker processes are started so concurrent chats
+    are not serialized on one core. The worker count defaults to the usual
+    2*cpu+1 rule and can be pinned with the WORKERS environment variable;
+    auto-reload stays off unless RELOAD=1 is set for development.
+
     Raises:
         Exception: If the server fails to start due to misconfiguration or environmental issues.
     """
-    uvicorn.run("fake_ollama_server:app", host=OLLAMA_ADDRESS, port=OLLAMA_PORT, reload=True, log_level="info")
+    reload = os.getenv("RELOAD") == "1"
+    workers = int(os.getenv("WORKERS", "0")) or (os.cpu_count() or 1) * 2 + 1
+    uvicorn.run(
+        "fake_ollama_server:app",
+        host=OLLAMA_ADDRESS,
+        port=OLLAMA_PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if reload else workers,
+        reload=reload,
+        log_level="info",
+    )
 
 
 if __name__ == "__main__":